@@ -1,3 +1,4 @@
+import sqlite3
 from typing import List
 
 from crewai import Agent, Crew, Process, Task
@@ -19,6 +20,10 @@ class TextToSqlCrew:
     agents_config = "config/agents.yaml"
     tasks_config = "config/tasks.yaml"
 
+    def __init__(self, conn: sqlite3.Connection | None = None):
+        # Connection shared with the database tool, so it doesn't open its own
+        self.conn = conn
+
     @agent
     def database_specialist(self) -> Agent:
         return Agent(
@@ -29,7 +34,7 @@ class TextToSqlCrew:
     def perform_sql_query(self) -> Task:
         return Task(
             config=self.tasks_config["perform_sql_query"],
-            tools=[SQLiteDatabaseTool()],
+            tools=[SQLiteDatabaseTool(conn=self.conn)],
         )
 
     @crew
@@ -5,13 +5,97 @@ This tool provides a secure interface for executing SQL queries against the cust
 It includes proper error handling, connection management, and query validation.
 """
 
+import atexit
 import logging
+import re
 import sqlite3
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Type
 
 from crewai.tools import BaseTool
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
+
+# Database paths given to the tool are relative to the project root
+PROJECT_ROOT = Path(__file__).resolve().parents[5]
+
+# Read-side tuning applied to every connection the tool opens. The journal mode is a
+# persistent property of the database file and is set by the flow when it loads it.
+# query_only backs up the read-only open: SQLite refuses any write on the connection.
+SQLITE_READ_PRAGMAS = """
+PRAGMA query_only=ON;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA mmap_size=268435456;
+PRAGMA busy_timeout=5000;
+"""
+
+# Number of rows included in the sample returned to the agent
+MAX_DISPLAY_ROWS = 20
+
+# Formatted results are reused for identical queries within a short window, so repeated
+# exploratory SELECTs skip both execution and formatting
+RESULT_CACHE_SIZE = 128
+RESULT_CACHE_TTL = 60.0
+
+# Compiled statements kept per connection, twice the result cache since every
+# query that overflows the sample also runs a COUNT
+STATEMENT_CACHE_SIZE = 256
+
+# Validation patterns, compiled once at import rather than on every tool call
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+SELECT_PREFIX = re.compile(r"\s*SELECT\b", re.IGNORECASE)
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z_0-9]*")
+
+# Keywords that must never appear as a token in an agent query
+DANGEROUS_KEYWORDS = frozenset(
+    {
+        "DROP",
+        "DELETE",
+        "INSERT",
+        "UPDATE",
+        "ALTER",
+        "CREATE",
+        "TRUNCATE",
+        "ATTACH",
+        "PRAGMA",
+    }
+)
+
+# SQL split into literals, quoted identifiers, comments, terminators, whitespace and
+# everything else, used to find where the statement itself ends and to normalize
+# cache keys
+SQL_TOKEN = re.compile(
+    r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?(?:\*/|\Z)|;|\s+|[^'"\-/;\s]+|.""",
+    re.DOTALL,
+)
+
+
+def connect_read_only(db_path: str) -> sqlite3.Connection:
+    """
+    Open a tuned, read-only connection to a SQLite database.
+
+    Args:
+        db_path: Absolute path to the SQLite database file
+
+    Returns:
+        An open SQLite connection usable from any thread
+    """
+    # Read-only, so SQLite never needs to take a write lock. Repeated SQL text reuses
+    # its compiled statement from the connection's cache, skipping parser and planner.
+    conn = sqlite3.connect(
+        f"{Path(db_path).as_uri()}?mode=ro",
+        uri=True,
+        check_same_thread=False,
+        cached_statements=STATEMENT_CACHE_SIZE,
+    )
+    conn.executescript(SQLITE_READ_PRAGMAS)
+
+    # Enable row factory for better result formatting
+    conn.row_factory = sqlite3.Row
+
+    return conn
 
 
 class SQLiteQueryInput(BaseModel):
@@ -31,23 +115,18 @@ class SQLiteQueryInput(BaseModel):
     @classmethod
     def validate_query_safety(cls, v):
         """Ensure only SELECT queries are allowed for security."""
-        query_upper = v.strip().upper()
-        if not query_upper.startswith("SELECT"):
+        # Keywords inside string literals are data, not SQL
+        stripped = STRING_LITERAL.sub("''", v)
+        if not SELECT_PREFIX.match(stripped):
             raise ValueError("Only SELECT queries are allowed for security reasons")
 
         # Block potentially dangerous SQL keywords
-        dangerous_keywords = [
-            "DROP",
-            "DELETE",
-            "INSERT",
-            "UPDATE",
-            "ALTER",
-            "CREATE",
-            "TRUNCATE",
-        ]
-        for keyword in dangerous_keywords:
-            if keyword in query_upper:
-                raise ValueError(f"Query contains forbidden keyword: {keyword}")
+        tokens = IDENTIFIER.findall(stripped)
+        forbidden = DANGEROUS_KEYWORDS.intersection(map(str.upper, tokens))
+        if forbidden:
+            raise ValueError(
+                f"Query contains forbidden keyword: {', '.join(sorted(forbidden))}"
+            )
 
         return v
 
@@ -70,6 +149,119 @@ class SQLiteDatabaseTool(BaseTool):
     )
     args_schema: Type[BaseModel] = SQLiteQueryInput
 
+    _conn: sqlite3.Connection | None = PrivateAttr(default=None)
+    _conn_cache: dict[str, sqlite3.Connection] = PrivateAttr(default_factory=dict)
+    _result_cache: OrderedDict[tuple[str, int, str], tuple[float, str]] = PrivateAttr(
+        default_factory=OrderedDict
+    )
+
+    def __init__(self, conn: sqlite3.Connection | None = None, **kwargs):
+        """
+        Create the tool, optionally bound to a connection owned by the caller.
+
+        Args:
+            conn: Open connection to run every query on. When omitted, the tool opens
+                its own read-only connection from the database path given per query.
+        """
+        super().__init__(**kwargs)
+        self._conn = conn
+
+    def _get_conn(self, db_path: str) -> sqlite3.Connection:
+        """
+        Return the cached read-only connection for a database, opening it on first use.
+
+        Args:
+            db_path: Absolute path to the SQLite database file
+
+        Returns:
+            An open, tuned SQLite connection
+        """
+        conn = self._conn_cache.get(db_path)
+        if conn is None:
+            conn = connect_read_only(db_path)
+            self._conn_cache[db_path] = conn
+            atexit.register(conn.close)
+        return conn
+
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Collapse insignificant whitespace so equivalent queries share a cache entry.
+
+        Literals and comments are kept verbatim, and the whitespace ending a line
+        comment stays a newline since it decides where the comment stops.
+        """
+        parts = []
+        for token in SQL_TOKEN.finditer(query.strip()):
+            text = token.group()
+            if text.isspace():
+                text = "\n" if parts and parts[-1].startswith("--") else " "
+            parts.append(text)
+        return "".join(parts)
+
+    @staticmethod
+    def _strip_statement_end(query: str) -> str:
+        """Drop trailing comments and semicolons so the query can be nested."""
+        end = 0
+        for token in SQL_TOKEN.finditer(query):
+            text = token.group()
+            if not (text == ";" or text.isspace() or text.startswith(("--", "/*"))):
+                end = token.end()
+        return query[:end].strip()
+
+    def _execute_query(self, conn: sqlite3.Connection, query: str) -> str:
+        """
+        Execute a SQL query on an open connection and format the results.
+
+        Args:
+            conn: Connection to run the query on
+            query: SQL SELECT query to execute
+
+        Returns:
+            Formatted string containing query results
+        """
+        cursor = conn.cursor()
+
+        # Execute the query, letting SQLite stop one row past the displayed sample
+        subquery = self._strip_statement_end(query)
+        cursor.execute(f"SELECT * FROM (\n{subquery}\n) LIMIT {MAX_DISPLAY_ROWS + 1}")
+        rows = cursor.fetchmany(MAX_DISPLAY_ROWS)
+        columns = [column[0] for column in cursor.description]
+
+        # Only count the full result set when it doesn't fit in the sample
+        total_rows = len(rows)
+        if cursor.fetchone() is not None:
+            cursor.execute(f"SELECT COUNT(*) FROM (\n{subquery}\n)")
+            total_rows = cursor.fetchone()[0]
+
+        # Format results
+        if not rows:
+            return "Query executed successfully but returned no results."
+
+        # Format output with summary, collecting the pieces and joining them once
+        parts: list[str] = [
+            f"Query executed successfully. Retrieved {total_rows} row(s).\n\n"
+        ]
+
+        # Add column headers
+        parts.append(f"Columns: {', '.join(columns)}\n\n")
+
+        # Add first few rows as examples (limit to prevent overwhelming output)
+        parts.append(f"Sample results (showing first {len(rows)} rows):\n")
+
+        for i, row in enumerate(rows, 1):
+            parts.append(f"\nRow {i}:\n")
+            for column, value in zip(columns, row):
+                # Truncate long text fields for readability
+                display_value = str(value)
+                if len(display_value) > 100:
+                    display_value = display_value[:97] + "..."
+                parts.append(f"  {column}: {display_value}\n")
+
+        if total_rows > len(rows):
+            parts.append(f"\n... and {total_rows - len(rows)} more rows.")
+
+        return "".join(parts)
+
     def _run(
         self, query: str, database_path: str = "data/customer_support_tickets.db"
     ) -> str:
@@ -84,62 +276,39 @@ class SQLiteDatabaseTool(BaseTool):
             Formatted string containing query results or error message
         """
         try:
-            # Resolve the database path relative to project root
-            project_root = Path(__file__).parent.parent.parent.parent.parent.parent
-            full_db_path = project_root / database_path
-
-            # Verify database file exists
-            if not full_db_path.exists():
-                return f"Error: Database file not found at {full_db_path}"
-
-            # Execute query with proper connection management
-            with sqlite3.connect(str(full_db_path)) as conn:
-                # Enable row factory for better result formatting
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-
-                # Execute the query
-                cursor.execute(query)
-                rows = cursor.fetchall()
-
-                # Format results
-                if not rows:
-                    return "Query executed successfully but returned no results."
-
-                # Convert to list of dictionaries for better readability
-                results = [dict(row) for row in rows]
-
-                # Format output with summary
-                result_summary = (
-                    f"Query executed successfully. Retrieved {len(results)} row(s).\n\n"
-                )
-
-                # Add column headers
-                if results:
-                    columns = list(results[0].keys())
-                    result_summary += "Columns: " + ", ".join(columns) + "\n\n"
-
-                # Add first few rows as examples (limit to prevent overwhelming output)
-                max_display_rows = min(20, len(results))
-                result_summary += (
-                    f"Sample results (showing first {max_display_rows} rows):\n"
-                )
-
-                for i, row in enumerate(results[:max_display_rows], 1):
-                    result_summary += f"\nRow {i}:\n"
-                    for key, value in row.items():
-                        # Truncate long text fields for readability
-                        display_value = str(value)
-                        if len(display_value) > 100:
-                            display_value = display_value[:97] + "..."
-                        result_summary += f"  {key}: {display_value}\n"
-
-                if len(results) > max_display_rows:
-                    result_summary += (
-                        f"\n... and {len(results) - max_display_rows} more rows."
-                    )
-
-                return result_summary
+            # Queries run on the connection handed over at construction when there is
+            # one; otherwise resolve the database path relative to project root
+            if self._conn is None:
+                full_db_path = PROJECT_ROOT / database_path
+                database_path = str(full_db_path)
+
+                # Verify database file exists, unless it is already open
+                if database_path not in self._conn_cache and not full_db_path.exists():
+                    return f"Error: Database file not found at {full_db_path}"
+
+            # Use the shared connection, or a cached read-only one for this database
+            conn = self._conn
+            if conn is None:
+                conn = self._get_conn(database_path)
+
+            # Serve repeated queries from the result cache while still fresh. The data
+            # version changes whenever another connection commits, so a reload of the
+            # database never serves results from before it.
+            data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            cache_key = (database_path, data_version, self._normalize_query(query))
+            cached = self._result_cache.get(cache_key)
+            if cached is not None and time.monotonic() - cached[0] < RESULT_CACHE_TTL:
+                self._result_cache.move_to_end(cache_key)
+                return cached[1]
+
+            result_summary = self._execute_query(conn, query)
+
+            self._result_cache[cache_key] = (time.monotonic(), result_summary)
+            self._result_cache.move_to_end(cache_key)
+            if len(self._result_cache) > RESULT_CACHE_SIZE:
+                self._result_cache.popitem(last=False)
+
+            return result_summary
 
         except sqlite3.Error as e:
             error_msg = f"SQLite error: {str(e)}"
@@ -1,13 +1,52 @@
 #!/usr/bin/env python
-from sqlite3 import connect
+import csv
+import logging
+import os
+import re
+import sqlite3
+import weakref
 
-import pandas as pd
 from crewai.flow import Flow, listen, start
 from pydantic import BaseModel
 
 from customer_support_ticket_flow.crews import (
     TextToSqlCrew,
 )
+from customer_support_ticket_flow.crews.text_to_sql_crew.tools.text_to_sql_tool import (
+    connect_read_only,
+)
+
+# busy_timeout comes first so waiting on locks held by other connections, such as the
+# crew's long-lived reader, applies to everything that follows
+SQLITE_PRAGMAS = """
+PRAGMA busy_timeout=5000;
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-64000;
+PRAGMA mmap_size=268435456;
+"""
+
+# The journal stays in WAL mode for the load: leaving it needs exclusive access, which
+# the crew's read-only connection prevents once it is open
+SQLITE_BULK_LOAD_PRAGMAS = """
+PRAGMA synchronous=OFF;
+"""
+
+# Bumped whenever the loader changes the table it builds (types, indexes, DDL), so
+# databases written by an older loader are rebuilt instead of reused
+SCHEMA_VERSION = 1
+
+# Values that let a CSV column keep a numeric SQLite type, as pandas would infer it
+INTEGER_VALUE = re.compile(r"[+-]?\d+")
+REAL_VALUE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+# Indexes on the columns agents most often filter and group by
+TABLE_INDEXES = {
+    "idx_status_type": ("Ticket Status", "Ticket Type"),
+    "idx_gender": ("Customer Gender",),
+    "idx_priority": ("Ticket Priority",),
+}
 
 
 class State(BaseModel):
@@ -23,43 +62,178 @@ class CustomerSupportTicketFlow(Flow[State]):
         self.table_name = "customer_support_tickets"
         self.csv_data_path = f"data/{self.table_name}.csv"
         self.database_path = f"data/{self.table_name}.db"
+        self.ddl_cache_path = f"{self.database_path}.ddl"
 
         self.conn = None
         self.cursor = None
+        self.read_conn = None
+        self.text_to_sql_crew = None
 
     @start()
     def load_dataset(self):
         print(">>> Loading dataset")
 
-        df = pd.read_csv(self.csv_data_path, na_filter=False)
+        # The database only needs rebuilding when the CSV changed after it was written
+        # or it was built by a different version of this loader
+        csv_mtime = os.path.getmtime(self.csv_data_path)
+        db_mtime = (
+            os.path.getmtime(self.database_path)
+            if os.path.exists(self.database_path)
+            else 0
+        )
 
-        self.conn = connect(self.database_path)
+        self.conn = sqlite3.connect(self.database_path)
+        self.conn.executescript(SQLITE_PRAGMAS)
         self.cursor = self.conn.cursor()
 
-        df.to_sql(self.table_name, self.conn, if_exists="replace", index=False)
+        if (
+            db_mtime >= csv_mtime
+            and self._table_exists()
+            and self._schema_version() == SCHEMA_VERSION
+        ):
+            print(">>> Dataset is up to date, skipping reload")
+
+            # Indexes are cheap to add to an existing table, so don't depend on a
+            # rebuild to get them
+            if not self._indexes_exist():
+                self.conn.execute("BEGIN IMMEDIATE")
+                self._create_indexes()
+                self.conn.commit()
+            return
+
+        # The cached DDL describes the table being replaced
+        if os.path.exists(self.ddl_cache_path):
+            os.remove(self.ddl_cache_path)
+
+        column_types = self._infer_column_types()
+
+        # The table is rebuilt from scratch, so skip fsyncs while loading it and insert
+        # every row inside a single transaction. BEGIN IMMEDIATE takes the write lock
+        # up front, waiting out other writers instead of failing halfway through.
+        self.conn.executescript(SQLITE_BULK_LOAD_PRAGMAS)
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.cursor.execute(f'DROP TABLE IF EXISTS "{self.table_name}"')
+
+            column_definitions = ",\n  ".join(
+                f'"{column}" {column_type}'
+                for column, column_type in column_types.items()
+            )
+            self.cursor.execute(
+                f'CREATE TABLE "{self.table_name}" (\n  {column_definitions}\n)'
+            )
+
+            # Values are inserted as text; the column types let SQLite convert numbers
+            with open(self.csv_data_path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                next(reader)
+                placeholders = ", ".join("?" * len(column_types))
+                self.cursor.executemany(
+                    f'INSERT INTO "{self.table_name}" VALUES ({placeholders})', reader
+                )
+
+            self._create_indexes()
+            self.cursor.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+            self.conn.commit()
+        except Exception:
+            # Keep the previous table rather than leave a half-built one behind
+            self.conn.rollback()
+            raise
+
+        self.conn.executescript(SQLITE_PRAGMAS)
+
+    def _infer_column_types(self):
+        """Map every CSV column to INTEGER, REAL or TEXT based on all of its values."""
+        with open(self.csv_data_path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            column_types = dict.fromkeys(next(reader), "INTEGER")
+            columns = list(column_types)
+
+            for row in reader:
+                for column, value in zip(columns, row):
+                    column_type = column_types[column]
+                    if column_type == "INTEGER" and not INTEGER_VALUE.fullmatch(value):
+                        column_type = "REAL"
+                    if column_type == "REAL" and not REAL_VALUE.fullmatch(value):
+                        column_type = "TEXT"
+                    column_types[column] = column_type
+
+        return column_types
+
+    def _create_indexes(self):
+        for index_name, columns in TABLE_INDEXES.items():
+            indexed_columns = ", ".join(f'"{column}"' for column in columns)
+            self.cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+                f'ON "{self.table_name}" ({indexed_columns})'
+            )
+
+        # Refresh planner statistics so the new indexes get used
+        self.cursor.execute("ANALYZE")
+
+    def _indexes_exist(self):
+        self.cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name=?",
+            (self.table_name,),
+        )
+        existing = {row[0] for row in self.cursor.fetchall()}
+        return existing.issuperset(TABLE_INDEXES)
+
+    def _table_exists(self):
+        self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?",
+            (self.table_name,),
+        )
+        return self.cursor.fetchone() is not None
+
+    def _schema_version(self):
+        self.cursor.execute("PRAGMA user_version")
+        return self.cursor.fetchone()[0]
 
     @listen(load_dataset)
     def inspect_database_structure(self):
         print(">>> Inspecting database structure")
+
+        # The DDL only changes when the database is rebuilt, which deletes the cached
+        # copy. The cache is compared against the CSV rather than the database file,
+        # whose mtime moves whenever the WAL is checkpointed.
+        if os.path.exists(self.ddl_cache_path) and os.path.getmtime(
+            self.ddl_cache_path
+        ) >= os.path.getmtime(self.csv_data_path):
+            with open(self.ddl_cache_path, encoding="utf-8") as f:
+                self.state.database_structure = f.read()
+            return
+
         self.cursor.execute(
-            f"SELECT sql FROM sqlite_master WHERE type='table' AND name='{self.table_name}'"
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name=?",
+            (self.table_name,),
         )
         ddl = self.cursor.fetchone()[0]
         self.state.database_structure = ddl
+        with open(self.ddl_cache_path, "w", encoding="utf-8") as f:
+            f.write(ddl)
 
     @listen(inspect_database_structure)
     def answer_user_prompt(self):
         print(">>> Answering user prompt")
-        result = (
-            TextToSqlCrew()
-            .crew()
-            .kickoff(
-                inputs={
-                    "user_prompt": self.state.user_prompt,
-                    "database_structure": self.state.database_structure,
-                    "database_path": self.database_path,
-                }
-            )
+
+        # The crew is built once per flow, parsing its config and constructing its
+        # agents and tasks only the first time. Every question runs on a fresh copy so
+        # no state leaks between kickoffs.
+        if self.text_to_sql_crew is None:
+            # One read-only connection serves every query the agent runs. It lives as
+            # long as the crew; WAL lets later loads rebuild the table underneath it.
+            self.read_conn = connect_read_only(os.path.abspath(self.database_path))
+            weakref.finalize(self, self.read_conn.close)
+            self.text_to_sql_crew = TextToSqlCrew(conn=self.read_conn).crew()
+
+        result = self.text_to_sql_crew.copy().kickoff(
+            inputs={
+                "user_prompt": self.state.user_prompt,
+                "database_structure": self.state.database_structure,
+                "database_path": self.database_path,
+            }
         )
         self.state.answer = result.raw
         with open("executive_summary.md", "w", encoding="utf-8") as f:
@@ -68,7 +242,31 @@ class CustomerSupportTicketFlow(Flow[State]):
     @listen(answer_user_prompt)
     def close_connection(self):
         print(">>> Closing connection")
-        self.conn.close()
+        self._close_connection()
+
+    def kickoff(self, *args, **kwargs):
+        # A failing step skips close_connection, so release the database here too
+        try:
+            return super().kickoff(*args, **kwargs)
+        finally:
+            self._close_connection()
+
+    def _close_connection(self):
+        if self.conn is None:
+            return
+
+        # Fold the WAL back into the database file before letting go of it. Cleanup
+        # must never replace the error that may have brought us here.
+        try:
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            logging.warning(f"Could not checkpoint the database on close: {e}")
+        finally:
+            self.conn.close()
+            self.conn = None
+            self.cursor = None
 
 
 def kickoff():